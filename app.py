@@ -1,11 +1,16 @@
 import sqlite3
 import json
+import hashlib
+import sys
 from flask import Flask, render_template, request, jsonify
-import pokebase as pb
 import math
 import threading
 import os
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
+from functools import lru_cache
+from itertools import combinations, product
 from move_to_db import (
     POKEMON_GO_AVAILABLE,
     LEGENDARY_POKEMON,
@@ -15,17 +20,104 @@ from move_to_db import (
     GMAX_POKEMON,
     TYPE_CHART,
 )
+from pokeapi_store import PokeAPIStore, ResourceNotFound
+from jobs import JobScheduler, JobCancelled
 
 app = Flask(__name__)
 
 # Database configuration
 DATABASE_PATH = "pokemon_go.db"
 
-# Configure pokebase caching for better performance
-# pokebase automatically caches API responses to avoid repeated requests
-from pokebase import cache
+# Raw PokeAPI responses are kept in a single compressed SQLite store.
+# Swap api_store.fetcher for a pokeapi_store.LocalFetcher in tests.
+API_STORE_PATH = "pokeapi_cache.db"
+api_store = PokeAPIStore(API_STORE_PATH)
+
+# All Pokemon types, in the order shown in the UI
+POKEMON_TYPES = [
+    "normal",
+    "fire",
+    "water",
+    "electric",
+    "grass",
+    "ice",
+    "fighting",
+    "poison",
+    "ground",
+    "flying",
+    "psychic",
+    "bug",
+    "rock",
+    "ghost",
+    "dragon",
+    "dark",
+    "steel",
+    "fairy",
+]
+
+# Every single and dual defender type combo (18 + 153 = 171)
+DEFENDER_TYPE_COMBOS = [(t,) for t in POKEMON_TYPES] + list(
+    combinations(POKEMON_TYPES, 2)
+)
 
-cache.API_CACHE
+# Maximum number of Pokemon accepted in a coverage team
+MAX_TEAM_SIZE = 6
+
+# Versioned parameters for converting raw base stats to Pokemon GO stats.
+# Stored pogo_* columns use these defaults; rankings recompute from base
+# stats so a request can pass a partial ?params= override for what-if runs.
+DEFAULT_STAT_PARAMS = {
+    "version": 1,
+    "speed_base": 75,
+    "speed_divisor": 500,
+    "stat_scale": 2,
+    "attack_weights": [7 / 8, 1 / 8],
+    "defense_weights": [5 / 8, 3 / 8],
+    "stamina_base": 50,
+    "stamina_scale": 1.75,
+    "minimum_stat": 10,
+    "form_attack_bonus": {"mega": 1.3, "shadow": 1.2, "max": 1.1},
+}
+
+# Base stat names as used by PokeAPI and compute_pogo_stat_columns
+BASE_STAT_NAMES = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+
+# Recomputed rosters keyed by (database version, params hash)
+ROSTER_CACHE_MAX_SIZE = 16
+roster_cache = OrderedDict()
+roster_cache_lock = threading.Lock()
+
+# Defender bulk rankings keyed by (database version, params hash, attacker types)
+BULK_INDEX_CACHE_MAX_SIZE = 256
+bulk_index_cache = OrderedDict()
+
+# Rebuilds are written next to the live database and swapped in atomically
+REBUILD_DATABASE_PATH = DATABASE_PATH + ".rebuild"
+REBUILD_MIN_ROW_RATIO = 0.95  # Share of expected/previous rows a rebuild must reach
+
+# Cache-miss fetch settings
+FETCH_TIMEOUT_SECONDS = 10  # How long a request waits on an upstream fetch
+NEGATIVE_CACHE_TTL_SECONDS = 5 * 60  # How long an id upstream doesn't know is not retried
+UPSTREAM_FAILURE_TTL_SECONDS = 30  # How long an id is not retried after a network/server error
+NEGATIVE_CACHE_MAX_SIZE = 1024
+
+# Outcomes of a cache-miss fetch
+FETCH_OK = "ok"
+FETCH_NOT_FOUND = "not_found"  # Upstream has no such Pokemon
+FETCH_FAILED = "failed"  # Network or upstream server error
+FETCH_TIMEOUT = "timeout"  # Still running after FETCH_TIMEOUT_SECONDS
+
+# In-flight fetches by Pokemon ID, and recently failed IDs -> (outcome, expiry time)
+inflight_fetches = {}
+failed_fetches = OrderedDict()
+fetch_lock = threading.Lock()
+
+# Background jobs (ingest, precompute, rebuild)
+JOB_MAX_CONCURRENT = 2
+JOB_CHECKPOINT_INTERVAL = 25  # Items between persisted checkpoints
+# Starting and cancelling jobs is unauthenticated, so it is only served to
+# clients on this machine
+JOB_CONTROL_ADDRESSES = ("127.0.0.1", "::1")
 
 # Global variables for Pokemon list
 pokemon_list_cache = None
@@ -34,9 +126,9 @@ pokemon_count = 0
 
 
 @contextmanager
-def get_db_connection():
+def get_db_connection(path=None):
     """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(path or DATABASE_PATH)
     conn.row_factory = sqlite3.Row  # This allows accessing columns by name
     try:
         yield conn
@@ -44,11 +136,11 @@ def get_db_connection():
         conn.close()
 
 
-def init_database():
+def init_database(path=None):
     """Initialize the SQLite database with required tables"""
     print("DEBUG: Initializing database...")
 
-    with get_db_connection() as conn:
+    with get_db_connection(path) as conn:
         cursor = conn.cursor()
 
         # Create pokemon table
@@ -108,6 +200,40 @@ def init_database():
         print("DEBUG: Database initialized successfully")
 
 
+def load_job_checkpoint(name):
+    """Load a job's checkpoint from the metadata table"""
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT value FROM metadata WHERE key = ?", (f"job_checkpoint:{name}",)
+        ).fetchone()
+    return json.loads(row["value"]) if row else {}
+
+
+def save_job_checkpoint(name, state):
+    """Persist a job's checkpoint in the metadata table"""
+    with get_db_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO metadata (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            (f"job_checkpoint:{name}", json.dumps(state)),
+        )
+        conn.commit()
+
+
+def clear_job_checkpoint(name):
+    """Remove a finished job's checkpoint"""
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM metadata WHERE key = ?", (f"job_checkpoint:{name}",))
+        conn.commit()
+
+
+job_scheduler = JobScheduler(
+    max_concurrent=JOB_MAX_CONCURRENT,
+    load_checkpoint=load_job_checkpoint,
+    save_checkpoint=save_job_checkpoint,
+    clear_checkpoint=clear_job_checkpoint,
+)
+
+
 def is_pokemon_in_go(pokemon_id):
     """Check if Pokemon is available in Pokemon GO"""
     return pokemon_id in POKEMON_GO_AVAILABLE
@@ -133,6 +259,19 @@ def has_max(pokemon_id):
     return (pokemon_id in DMAX_POKEMON) or (pokemon_id in GMAX_POKEMON)
 
 
+def has_form(pokemon_id, form):
+    """Check if Pokemon can exist in the given form in Pokemon GO"""
+    if form == "normal":
+        return True
+    if form == "mega":
+        return has_mega(pokemon_id)
+    if form == "shadow":
+        return has_shadow(pokemon_id)
+    if form == "max":
+        return has_max(pokemon_id)
+    return False
+
+
 def get_pokemon_id_list(limit=None):
     """Get list of Pokemon IDs, optionally limited"""
     with get_db_connection() as conn:
@@ -151,141 +290,317 @@ def get_pokemon_id_list(limit=None):
         return ids
 
 
-def convert_to_pogo_stats(base_stats, is_shadow=False):
-    """Convert base stats to Pokemon Go format using official formulas"""
+def is_finite_number(value):
+    """True for finite ints/floats, excluding booleans"""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+def resolve_stat_params(overrides=None):
+    """
+    Merge a (possibly partial) params override into DEFAULT_STAT_PARAMS,
+    raising ValueError for anything that can't produce finite stats
+    """
+    params = json.loads(json.dumps(DEFAULT_STAT_PARAMS))
+    if not overrides:
+        return params
+    if not isinstance(overrides, dict):
+        raise ValueError("params must be a JSON object")
+
+    for key, value in overrides.items():
+        if key not in params:
+            raise ValueError(f"Unknown stat parameter: {key}")
+        if key == "form_attack_bonus":
+            if not isinstance(value, dict) or not all(
+                is_finite_number(v) for v in value.values()
+            ):
+                raise ValueError("form_attack_bonus must map form names to numbers")
+            params[key].update(value)
+        elif key in ("attack_weights", "defense_weights"):
+            if not isinstance(value, list) or len(value) != 2 or not all(
+                is_finite_number(v) for v in value
+            ):
+                raise ValueError(f"{key} must be a list of two numbers")
+            params[key] = value
+        elif is_finite_number(value):
+            params[key] = value
+        else:
+            raise ValueError(f"{key} must be a finite number")
+
+    if params["speed_divisor"] == 0:
+        raise ValueError("speed_divisor must not be 0")
+
+    # Finite inputs can still overflow (e.g. stamina_scale=1e308), so probe
+    # the formula, and the bulk ranking built on it, with the extremes of
+    # the base stat range
+    forms = ["normal"] + list(params["form_attack_bonus"])
+    weakest_effectiveness = min(min(row) for row in COMBO_EFFECTIVENESS.values())
+    for speed, base_stat in product((1, 255), repeat=2):
+        columns = {name: [base_stat] * len(forms) for name in BASE_STAT_NAMES}
+        columns["speed"] = [speed] * len(forms)
+        try:
+            _, defense, stamina = compute_pogo_stat_columns(columns, forms, params)
+            bulk = [float(d) * float(s) / weakest_effectiveness for d, s in zip(defense, stamina)]
+        except (OverflowError, ValueError):
+            raise ValueError("params produce stats that are not finite")
+        if not all(math.isfinite(b) for b in bulk):
+            raise ValueError("params produce stats that are not finite")
+
+    return params
+
+
+def stat_params_hash(params):
+    """Stable short hash of a resolved parameter set"""
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def get_request_stat_params():
+    """Resolve the optional ?params=<json> what-if override of a request"""
+    raw = request.args.get("params")
+    if not raw:
+        return resolve_stat_params()
+    try:
+        overrides = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"params is not valid JSON: {e}")
+    return resolve_stat_params(overrides)
+
+
+def compute_pogo_stat_columns(columns, forms, params=None):
+    """
+    Convert columns of base stats (hp, attack, defense, special-attack,
+    special-defense, speed lists) for a whole roster to Pokemon GO stats in
+    one pass, applying the form attack bonus. Returns attack, defense and
+    stamina lists.
+    """
+    params = params or DEFAULT_STAT_PARAMS
+    speed_base = params["speed_base"]
+    speed_divisor = params["speed_divisor"]
+    scale = params["stat_scale"]
+    atk_high, atk_low = params["attack_weights"]
+    def_high, def_low = params["defense_weights"]
+    minimum = params["minimum_stat"]
+    form_bonus = params["form_attack_bonus"]
+
+    # Speed scaling factor (used in all calculations)
+    speed_mod = [1 + (speed - speed_base) / speed_divisor for speed in columns["speed"]]
+
+    # Attack: 2 * (7/8 * higher_attack + 1/8 * lower_attack) * speed_mod
+    attack = [
+        max(round(scale * (atk_high * max(a, sa) + atk_low * min(a, sa)) * mod), minimum)
+        for a, sa, mod in zip(columns["attack"], columns["special-attack"], speed_mod)
+    ]
+    attack = [
+        math.ceil(value * form_bonus[form]) if form in form_bonus else value
+        for value, form in zip(attack, forms)
+    ]
+
+    # Defense: 2 * (5/8 * higher_defense + 3/8 * lower_defense) * speed_mod
+    defense = [
+        max(round(scale * (def_high * max(d, sd) + def_low * min(d, sd)) * mod), minimum)
+        for d, sd, mod in zip(columns["defense"], columns["special-defense"], speed_mod)
+    ]
+
+    # Stamina: 50 + (1.75 * HP)
+    stamina = [
+        max(round(params["stamina_base"] + params["stamina_scale"] * hp), minimum)
+        for hp in columns["hp"]
+    ]
+
+    return attack, defense, stamina
+
+
+def get_database_version():
+    """
+    Identify the current pokemon table contents for cache keys. The inode
+    changes when a rebuild is swapped in, and the row count and highest
+    rowid change on every insert, replace or delete of a pokemon row, while
+    metadata writes (checkpoints, last_populated) leave the version alone.
+    """
     try:
-        # print(f"DEBUG: Converting stats for Pokemon with base_stats: {base_stats}")
-
-        # Get individual stats
-        attack = base_stats["attack"]
-        defense = base_stats["defense"]
-        sp_attack = base_stats["special-attack"]
-        sp_defense = base_stats["special-defense"]
-        hp = base_stats["hp"]
-        speed = base_stats["speed"]
-
-        # print(f"DEBUG: Individual stats - ATK: {attack}, DEF: {defense}, SP_ATK: {sp_attack}, SP_DEF: {sp_defense}, HP: {hp}, SPD: {speed}")
-
-        # Speed scaling factor (used in all calculations)
-        speed_mod = 1 + (speed - 75) / 500
-        # print(f"DEBUG: Speed modifier: {speed_mod}")
-
-        # Attack: 2 * (7/8 * higher_attack + 1/8 * lower_attack) * speed_mod
-        higher_attack = max(attack, sp_attack)
-        lower_attack = min(attack, sp_attack)
-        pogo_attack_raw = 2 * (7 / 8 * higher_attack + 1 / 8 * lower_attack) * speed_mod
-        # print(f"DEBUG: Attack calc - Higher: {higher_attack}, Lower: {lower_attack}, Raw: {pogo_attack_raw}")
-
-        # Defense: 2 * (5/8 * higher_defense + 3/8 * lower_defense) * speed_mod
-        higher_defense = max(defense, sp_defense)
-        lower_defense = min(defense, sp_defense)
-        pogo_defense_raw = (
-            2 * (5 / 8 * higher_defense + 3 / 8 * lower_defense) * speed_mod
+        inode = os.stat(DATABASE_PATH).st_ino
+        with get_db_connection() as conn:
+            count, max_rowid = conn.execute(
+                "SELECT COUNT(*), MAX(rowid) FROM pokemon"
+            ).fetchone()
+        return (inode, count, max_rowid)
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def get_roster(params=None):
+    """
+    Get every Pokemon form with pogo stats recomputed from raw base stats
+    for the given parameter set. Results are cached per database version
+    and parameter hash.
+    """
+    params = params or resolve_stat_params()
+    key = (get_database_version(), stat_params_hash(params))
+
+    with roster_cache_lock:
+        if key in roster_cache:
+            roster_cache.move_to_end(key)
+            return roster_cache[key]
+
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, name, form, type1, type2, is_in_go, is_legendary,
+                   base_hp, base_attack, base_defense, base_sp_attack, base_sp_defense, base_speed
+            FROM pokemon ORDER BY id, form
+        """
+        ).fetchall()
+
+    columns = {
+        "hp": [row["base_hp"] for row in rows],
+        "attack": [row["base_attack"] for row in rows],
+        "defense": [row["base_defense"] for row in rows],
+        "special-attack": [row["base_sp_attack"] for row in rows],
+        "special-defense": [row["base_sp_defense"] for row in rows],
+        "speed": [row["base_speed"] for row in rows],
+    }
+    attack, defense, stamina = compute_pogo_stat_columns(
+        columns, [row["form"] for row in rows], params
+    )
+
+    roster = []
+    for i, row in enumerate(rows):
+        types = [row["type1"]]
+        if row["type2"]:
+            types.append(row["type2"])
+        roster.append({
+            "id": row["id"],
+            "name": row["name"],
+            "form": row["form"],
+            "types": types,
+            "is_in_go": bool(row["is_in_go"]),
+            "is_legendary": bool(row["is_legendary"]),
+            "attack": attack[i],
+            "defense": defense[i],
+            "stamina": stamina[i],
+        })
+
+    with roster_cache_lock:
+        roster_cache[key] = roster
+        while len(roster_cache) > ROSTER_CACHE_MAX_SIZE:
+            roster_cache.popitem(last=False)
+
+    return roster
+
+
+def apply_stat_params(data, params):
+    """Recompute a Pokemon data dict's pogo stats for a parameter set"""
+    columns = {name: [value] for name, value in data["base_stats"].items()}
+    attack, defense, stamina = compute_pogo_stat_columns(columns, [data["form"]], params)
+    return dict(data, pogo_stats={"attack": attack[0], "defense": defense[0], "stamina": stamina[0]})
+
+
+INSERT_POKEMON_SQL = """
+    INSERT OR REPLACE INTO pokemon (
+        id, name, form, type1, type2,
+        base_hp, base_attack, base_defense, base_sp_attack, base_sp_defense, base_speed,
+        pogo_attack, pogo_defense, pogo_stamina,
+        is_in_go, is_legendary,
+        updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+
+def build_pokemon_rows(base_data):
+    """Build one pokemon table row per GO form from a raw PokeAPI response"""
+    pokemon_id = base_data["id"]
+    base_name = base_data["name"].title()
+    types = [t["type"]["name"] for t in sorted(base_data["types"], key=lambda t: t["slot"])]
+    base_stats = {s["stat"]["name"]: s["base_stat"] for s in base_data["stats"]}
+
+    # Determine all forms to process
+    forms_to_process = [
+        {'form_name': 'normal', 'is_mega': False, 'is_shadow': False, 'is_max': False}
+    ]
+
+    if pokemon_id in MEGA_POKEMON:
+        forms_to_process.append({'form_name': 'mega', 'is_mega': True, 'is_shadow': False, 'is_max': False})
+    if pokemon_id in SHADOW_POKEMON:
+        forms_to_process.append({'form_name': 'shadow', 'is_mega': False, 'is_shadow': True, 'is_max': False})
+    if pokemon_id in DMAX_POKEMON or pokemon_id in GMAX_POKEMON:
+        forms_to_process.append({'form_name': 'max', 'is_mega': False, 'is_shadow': False, 'is_max': True})
+
+    forms = [form_info['form_name'] for form_info in forms_to_process]
+
+    # Calculate stats and apply bonuses for every form in one pass
+    columns = {name: [value] * len(forms) for name, value in base_stats.items()}
+    attack, defense, stamina = compute_pogo_stat_columns(columns, forms)
+
+    rows = []
+    for i, form_name in enumerate(forms):
+        # Update name for clarity
+        full_name = base_name if form_name == "normal" else f"{base_name} ({form_name.title()})"
+
+        rows.append(
+            (
+                pokemon_id,
+                full_name,
+                form_name,
+                types[0] if len(types) > 0 else 'normal',
+                types[1] if len(types) > 1 else None,
+                base_stats["hp"], base_stats["attack"], base_stats["defense"],
+                base_stats["special-attack"], base_stats["special-defense"], base_stats["speed"],
+                attack[i], defense[i], stamina[i],
+                is_pokemon_in_go(pokemon_id),
+                is_legendary(pokemon_id),
+            )
         )
-        # print(f"DEBUG: Defense calc - Higher: {higher_defense}, Lower: {lower_defense}, Raw: {pogo_defense_raw}")
 
-        # Stamina: 50 + (1.75 * HP)
-        pogo_stamina_raw = 50 + (1.75 * hp)
-        # print(f"DEBUG: Stamina calc - Raw: {pogo_stamina_raw}")
+    return rows
 
-        # Round and apply minimums
-        result = {
-            "attack": max(round(pogo_attack_raw), 10),
-            "defense": max(round(pogo_defense_raw), 10),
-            "stamina": max(round(pogo_stamina_raw), 10),
-        }
 
-        # print(f"DEBUG: Final Pokemon GO stats: {result}")
-        return result
+class UpstreamUnavailable(Exception):
+    """A Pokemon could not be loaded because the upstream API failed or timed out"""
 
-    except Exception as e:
-        print(f"ERROR in convert_to_pogo_stats: {e}")
-        print(f"ERROR: base_stats was: {base_stats}")
-        # Return default values to prevent crash
-        return {"attack": 10, "defense": 10, "stamina": 10}
+    def __init__(self, pokemon_id, outcome):
+        self.pokemon_id = pokemon_id
+        self.outcome = outcome
+        reason = "timed out" if outcome == FETCH_TIMEOUT else "is unavailable"
+        super().__init__(f"Upstream API {reason} for Pokemon {pokemon_id}")
+
+    @property
+    def status_code(self):
+        return 504 if self.outcome == FETCH_TIMEOUT else 503
 
 
 def fetch_and_store_pokemon_data(pokemon_id):
-    """Fetch Pokemon data from API and store in database"""
+    """Fetch Pokemon data from API and store in database, returning a FETCH_* outcome"""
     try:
         print(f"DEBUG: Fetching Pokemon data for ID: {pokemon_id}")
-                
-        # Get base form data
-        base_data = pb.pokemon(pokemon_id)
-        
-        # Determine all forms to process
-        forms_to_process = [
-            {'form_name': 'normal', 'is_mega': False, 'is_shadow': False, 'is_max': False}
-        ]
-        
-        if pokemon_id in MEGA_POKEMON:
-            forms_to_process.append({'form_name': 'mega', 'is_mega': True, 'is_shadow': False, 'is_max': False})
-        if pokemon_id in SHADOW_POKEMON:
-            forms_to_process.append({'form_name': 'shadow', 'is_mega': False, 'is_shadow': True, 'is_max': False})
-        if pokemon_id in DMAX_POKEMON or pokemon_id in GMAX_POKEMON:
-            forms_to_process.append({'form_name': 'max', 'is_mega': False, 'is_shadow': False, 'is_max': True})
 
-        # Update name for clarity
-        full_name = f"{base_data.name.title()}" if form_name == "normal" else f"{base_data.name.title()} ({form_name.title()})"
-
-        for form_info in forms_to_process:
-            form_name = form_info['form_name']
-            
+        # Get base form data
+        base_data = api_store.get_resource("pokemon", pokemon_id)
+        rows = build_pokemon_rows(base_data)
 
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                # Check if this specific form already exists to avoid duplicates
-                cursor.execute("SELECT COUNT(*) FROM pokemon WHERE id = ? AND form = ?", (pokemon_id, form_name))
-                db_count = cursor.fetchone()[0]
-            if db_count > 0:
-                continue
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # Only insert forms that don't exist yet to avoid duplicates
+            cursor.execute("SELECT form FROM pokemon WHERE id = ?", (pokemon_id,))
+            existing_forms = {row["form"] for row in cursor.fetchall()}
+            new_rows = [row for row in rows if row[2] not in existing_forms]
 
-            # Calculate stats and apply bonuses for the specific form
-            base_stats = {s.stat.name: s.base_stat for s in base_data.stats}
-            pogo_stats = convert_to_pogo_stats(base_stats)
-            
-            # Apply form-specific bonuses
-            if form_name == 'mega':
-                pogo_stats['attack'] = math.ceil(pogo_stats['attack'] * 1.3)
-            elif form_name == 'shadow':
-                pogo_stats['attack'] = math.ceil(pogo_stats['attack'] * 1.2)
-            elif form_name == 'max':
-                pogo_stats['attack'] = math.ceil(pogo_stats['attack'] * 1.1)
-
-            # Insert into the database
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT OR REPLACE INTO pokemon (
-                        id, name, form, type1, type2, 
-                        base_hp, base_attack, base_defense, base_sp_attack, base_sp_defense, base_speed,
-                        pogo_attack, pogo_defense, pogo_stamina,
-                        is_in_go, is_legendary,
-                        updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """,
-                    (
-                        base_data.id,
-                        full_name,
-                        form_name,
-                        base_data.types[0].type.name if len(base_data.types) > 0 else 'normal',
-                        base_data.types[1].type.name if len(base_data.types) > 1 else None,
-                        base_stats["hp"], base_stats["attack"], base_stats["defense"],
-                        base_stats["special-attack"], base_stats["special-defense"], base_stats["speed"],
-                        pogo_stats["attack"], pogo_stats["defense"], pogo_stats["stamina"],
-                        is_pokemon_in_go(base_data.id),
-                        is_legendary(base_data.id),
-                    ),
-                )
+            if new_rows:
+                cursor.executemany(INSERT_POKEMON_SQL, new_rows)
                 conn.commit()
 
-        print(f"DEBUG: Successfully stored {full_name}) in database")
-        return True
+        print(f"DEBUG: Successfully stored {base_data['name'].title()} in database")
+        return FETCH_OK
 
+    except ResourceNotFound as e:
+        print(f"ERROR fetching Pokemon {pokemon_id}: {e}")
+        return FETCH_NOT_FOUND
     except Exception as e:
         print(f"ERROR fetching Pokemon {pokemon_id}: {e}")
-        return False
+        return FETCH_FAILED
 
 
 def get_pokemon_data_from_db(pokemon_id, form):
@@ -325,19 +640,85 @@ def get_pokemon_data_from_db(pokemon_id, form):
 
 
 def get_pokemon_data(pokemon_id, form):
-    """Get Pokemon data - first try database, then API if not found"""
+    """
+    Get Pokemon data - first try database, then API if not found. Returns
+    None if the Pokemon doesn't exist and raises UpstreamUnavailable if the
+    API failed or timed out.
+    """
     # Try database first
     data = get_pokemon_data_from_db(pokemon_id, form)
     if data:
         return data
 
+    # A fetch stores every form the Pokemon has, so don't fetch for a form
+    # it can never have
+    if not has_form(pokemon_id, form):
+        return None
+
     # If not in database, fetch from API and store
-    if fetch_and_store_pokemon_data(pokemon_id):
+    outcome = fetch_pokemon_data_once(pokemon_id)
+    if outcome == FETCH_OK:
         return get_pokemon_data_from_db(pokemon_id, form)
+    if outcome in (FETCH_FAILED, FETCH_TIMEOUT):
+        raise UpstreamUnavailable(pokemon_id, outcome)
 
     return None
 
 
+def fetch_pokemon_data_once(pokemon_id, timeout=FETCH_TIMEOUT_SECONDS):
+    """
+    Fetch and store a Pokemon, coalescing concurrent misses for the same ID
+    into a single upstream fetch. IDs that recently failed are not retried
+    until their negative cache entry expires. Returns a FETCH_* outcome;
+    on FETCH_TIMEOUT the fetch keeps running in the background and stores
+    its result for later requests.
+    """
+    with fetch_lock:
+        failure = failed_fetches.get(pokemon_id)
+        if failure is not None:
+            outcome, expires_at = failure
+            if expires_at > time.time():
+                return outcome
+            del failed_fetches[pokemon_id]
+
+        inflight = inflight_fetches.get(pokemon_id)
+        if inflight is None:
+            inflight = {"done": threading.Event(), "outcome": FETCH_FAILED}
+            inflight_fetches[pokemon_id] = inflight
+            thread = threading.Thread(
+                target=_run_inflight_fetch, args=(pokemon_id, inflight)
+            )
+            thread.daemon = True
+            thread.start()
+
+    if not inflight["done"].wait(timeout):
+        print(f"DEBUG: Timed out waiting for Pokemon {pokemon_id} fetch")
+        return FETCH_TIMEOUT
+    return inflight["outcome"]
+
+
+def _run_inflight_fetch(pokemon_id, inflight):
+    """Run a coalesced fetch and publish its result to all waiters"""
+    outcome = FETCH_FAILED
+    try:
+        outcome = fetch_and_store_pokemon_data(pokemon_id)
+    finally:
+        with fetch_lock:
+            if outcome != FETCH_OK:
+                ttl = (
+                    NEGATIVE_CACHE_TTL_SECONDS
+                    if outcome == FETCH_NOT_FOUND
+                    else UPSTREAM_FAILURE_TTL_SECONDS
+                )
+                failed_fetches[pokemon_id] = (outcome, time.time() + ttl)
+                failed_fetches.move_to_end(pokemon_id)
+                while len(failed_fetches) > NEGATIVE_CACHE_MAX_SIZE:
+                    failed_fetches.popitem(last=False)
+            inflight_fetches.pop(pokemon_id, None)
+        inflight["outcome"] = outcome
+        inflight["done"].set()
+
+
 def should_include_pokemon_db(row, filters):
     """
     Checks if a database row (which is a specific Pokemon form)
@@ -390,73 +771,450 @@ def calculate_type_effectiveness(attacker_types, defender_types):
     return effectiveness
 
 
-def populate_database():
-    """Populate database with Pokemon data from the API"""
+def calculate_incoming_effectiveness(attacker_types, defender_types):
+    """
+    Calculate the best multiplier any of the attacker's types gets against
+    the defender, including resistances (unlike calculate_type_effectiveness,
+    this is not floored at 1.0)
+    """
+    multipliers = []
+    for att_type in attacker_types:
+        type_mult = 1.0
+        for def_type in defender_types:
+            type_mult *= TYPE_CHART.get(att_type, {}).get(def_type, 1.0)
+        multipliers.append(type_mult)
+
+    return max(multipliers) if multipliers else 1.0
+
+
+# Attacking type -> effectiveness against every combo in DEFENDER_TYPE_COMBOS
+COMBO_EFFECTIVENESS = {
+    att_type: [
+        calculate_incoming_effectiveness([att_type], combo)
+        for combo in DEFENDER_TYPE_COMBOS
+    ]
+    for att_type in POKEMON_TYPES
+}
+
+
+@lru_cache(maxsize=None)
+def get_combo_effectiveness(attacker_types):
+    """Best effectiveness of an attacker type tuple against every defender combo"""
+    rows = [COMBO_EFFECTIVENESS[t] for t in attacker_types if t in COMBO_EFFECTIVENESS]
+    if not rows:
+        return (1.0,) * len(DEFENDER_TYPE_COMBOS)
+    return tuple(max(values) for values in zip(*rows))
+
+
+def calculate_team_coverage(team):
+    """
+    Compute, for every defender type combo, the best effectiveness and
+    effective attack available from the team (a list of Pokemon data dicts).
+    """
+    member_rows = []
+    for member in team:
+        effectiveness = get_combo_effectiveness(tuple(member["types"]))
+        attack = member["pogo_stats"]["attack"]
+        member_rows.append((member, attack, effectiveness))
+
+    coverage = []
+    holes = []
+    super_effective_count = 0
+    total_effectiveness = 0.0
+
+    for index, combo in enumerate(DEFENDER_TYPE_COMBOS):
+        best_effectiveness = 0.0
+        best_attack = 0.0
+        best_member = None
+        for member, attack, effectiveness in member_rows:
+            eff = effectiveness[index]
+            if eff > best_effectiveness:
+                best_effectiveness = eff
+            if attack * eff > best_attack:
+                best_attack = attack * eff
+                best_member = member
+
+        entry = {
+            "types": list(combo),
+            "best_effectiveness": round(best_effectiveness, 2),
+            "best_effective_attack": round(best_attack, 1),
+            "best_attacker": (
+                {"id": best_member["id"], "form": best_member["form"], "name": best_member["name"]}
+                if best_member
+                else None
+            ),
+        }
+        coverage.append(entry)
+        total_effectiveness += best_effectiveness
+
+        # A combo is covered when at least one member hits it super effectively
+        if best_effectiveness > 1.0:
+            super_effective_count += 1
+        else:
+            holes.append(entry)
+
+    total = len(DEFENDER_TYPE_COMBOS)
+    return {
+        "coverage": coverage,
+        "holes": holes,
+        "summary": {
+            "total_combos": total,
+            "covered_combos": super_effective_count,
+            "hole_count": len(holes),
+            "score": round(100 * super_effective_count / total, 1),
+            "average_effectiveness": round(total_effectiveness / total, 3),
+        },
+    }
+
+
+def get_bulk_index(attacker_types, params=None):
+    """
+    Get every in-GO form ranked by bulk against the given attacking types,
+    where bulk = defense * stamina / incoming effectiveness. The sorted index
+    is built once per database version and parameter set, so a ranking is
+    a top-k read of its head.
+    """
+    params = params or resolve_stat_params()
+    attacker_types = tuple(sorted(set(attacker_types)))
+    key = (get_database_version(), stat_params_hash(params), attacker_types)
+
+    with roster_cache_lock:
+        if key in bulk_index_cache:
+            bulk_index_cache.move_to_end(key)
+            return bulk_index_cache[key]
+
+    index = []
+    for pokemon in get_roster(params):
+        if not pokemon["is_in_go"]:
+            continue
+        effectiveness = calculate_incoming_effectiveness(attacker_types, pokemon["types"])
+        bulk = float(pokemon["defense"]) * float(pokemon["stamina"]) / effectiveness
+        index.append((bulk, effectiveness, pokemon))
+    index.sort(key=lambda entry: entry[0], reverse=True)
+
+    with roster_cache_lock:
+        bulk_index_cache[key] = index
+        while len(bulk_index_cache) > BULK_INDEX_CACHE_MAX_SIZE:
+            bulk_index_cache.popitem(last=False)
+
+    return index
+
+
+def precompute_bulk_indexes(params=None, job=None):
+    """Build the bulk index for every single attacking type"""
+    for i, type_name in enumerate(POKEMON_TYPES):
+        if job:
+            job.check_cancelled()
+            job.progress(i, len(POKEMON_TYPES))
+        get_bulk_index((type_name,), params)
+
+    if job:
+        job.progress(len(POKEMON_TYPES), len(POKEMON_TYPES))
+
+
+def precompute_bulk_indexes_job(job):
+    """Job target warming the bulk indexes for the default parameters"""
+    precompute_bulk_indexes(job=job)
+
+
+def get_top_defenders_from_index(attacker_types, filters, params, limit=25):
+    """Read the top defenders passing the filters from the head of a bulk index"""
+    defenders = []
+    for bulk, effectiveness, pokemon in get_bulk_index(attacker_types, params):
+        if not should_include_pokemon_db(pokemon, filters):
+            continue
+        defenders.append({
+            "name": pokemon["name"],
+            "id": pokemon["id"],
+            "form": pokemon["form"],
+            "types": pokemon["types"],
+            "defense": pokemon["defense"],
+            "stamina": pokemon["stamina"],
+            "effectiveness": round(effectiveness, 2),
+            "bulk": round(bulk, 1),
+            "is_legendary": pokemon["is_legendary"],
+        })
+        if len(defenders) >= limit:
+            break
+    return defenders
+
+
+def populate_database(job=None):
+    """
+    Populate database with Pokemon data from the API. When run as a job,
+    reports progress and checkpoints its position so an interrupted run
+    resumes where it stopped.
+    """
     print("DEBUG: Starting database population...")
 
     try:
         # Get Pokemon list from API
         print("DEBUG: Fetching Pokemon list from API...")
         
+        # Connections are opened per statement rather than held for the
+        # whole run, so a rebuild swapped in meanwhile is picked up
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM pokemon")
-            count = cursor.fetchone()[0]
+            # Count species, not rows: each species has a row per form
+            count = conn.execute("SELECT COUNT(DISTINCT id) FROM pokemon").fetchone()[0]
+
+        pokemon_resource_list = api_store.get_resource("pokemon", limit=1010)
+
+        total_pokemon = min(
+            pokemon_resource_list["count"], 1010
+        )  # Limit to reasonable range
+        print(f"DEBUG: Will populate {total_pokemon} Pokemon...")
+
+        # Check if database is already populated
+
+        if count >= total_pokemon:
+            print(f"DEBUG: Database already contains {count} Pokemon. Skipping population.")
+            if job:
+                job.progress(total_pokemon, total_pokemon)
+            job_scheduler.submit("precompute", precompute_bulk_indexes_job)
+            return
+
+        # Resume from the last checkpoint, if any
+        checkpoint = job.checkpoint if job else {}
+        start_index = checkpoint.get("next_index", 0)
+        success_count = checkpoint.get("success_count", 0)
+        if start_index:
+            print(f"DEBUG: Resuming population at {start_index}/{total_pokemon}")
+
+        for i, pokemon_ref in enumerate(pokemon_resource_list["results"]):
+            if i < start_index:
+                continue
+            if i > total_pokemon: # Limit total of pokemon that are processed
+                break
+
+            if job:
+                job.check_cancelled()
+                job.progress(i, total_pokemon)
+                if i % JOB_CHECKPOINT_INTERVAL == 0:
+                    job.save_checkpoint({"next_index": i, "success_count": success_count})
+
+            if (i + 1) % 50 == 0:  # Progress every 50
+                print(
+                    f"DEBUG: Populated {i + 1}/{total_pokemon} Pokemon... ({success_count} successful)"
+                )
+
+            # Extract ID from URL
+            pokemon_id = int(pokemon_ref["url"].strip("/").split("/")[-1])
+
+            # Skip if pokemon is already in the DB
+            with get_db_connection() as conn:
+                db_count = conn.execute(
+                    "SELECT COUNT(*) FROM pokemon WHERE id = ?", (pokemon_id,)
+                ).fetchone()[0]
+            if db_count > 0:
+                success_count += 1
+                continue
+            
+            # If not skipping, pull data and store
+            if fetch_pokemon_data_once(pokemon_id, timeout=None) == FETCH_OK:
+                success_count += 1
+
+        if job:
+            job.progress(total_pokemon, total_pokemon)
+
+        print(
+            f"DEBUG: Database population completed! {success_count}/{total_pokemon} Pokemon stored successfully."
+        )
 
-            pokemon_resource_list = pb.APIResourceList("pokemon")
+        # Update metadata
+        with get_db_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+                ("last_populated", f"{success_count} Pokemon"),
+            )
+            conn.commit()
 
-            total_pokemon = min(
-                pokemon_resource_list.count, 1010
-            )  # Limit to reasonable range
-            print(f"DEBUG: Will populate {total_pokemon} Pokemon...")
+        # Warm the defender bulk indexes for the default parameters
+        job_scheduler.submit("precompute", precompute_bulk_indexes_job)
 
-            # Check if database is already populated
+    except JobCancelled:
+        print("DEBUG: Database population cancelled")
+        raise
+    except Exception as e:
+        print(f"ERROR during database population: {e}")
+        import traceback
 
-            if count >= total_pokemon:
-                print(f"DEBUG: Database already contains {count} Pokemon. Skipping population.")
-                return
+        print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        if job:
+            raise
 
-            success_count = 0
 
-            for i, pokemon_ref in enumerate(pokemon_resource_list):
-                if i > total_pokemon: # Limit total of pokemon that are processed
-                    break
+def compute_rows_checksum(rows):
+    """
+    Row count and SHA-256 of pokemon rows given in INSERT_POKEMON_SQL column
+    order, keyed by (id, form) as the table is. Booleans are hashed as the
+    integers SQLite stores them as.
+    """
+    unique = {
+        (row[0], row[2]): tuple(int(v) if isinstance(v, bool) else v for v in row)
+        for row in rows
+    }
+    digest = hashlib.sha256()
+    for key in sorted(unique):
+        digest.update(repr(unique[key]).encode("utf-8"))
+    return len(unique), digest.hexdigest()
 
-                if (i + 1) % 50 == 0:  # Progress every 50
-                    print(
-                        f"DEBUG: Populated {i + 1}/{total_pokemon} Pokemon... ({success_count} successful)"
-                    )
 
-                # Extract ID from URL
-                pokemon_id = int(pokemon_ref["url"].strip("/").split("/")[-1])
+def compute_pokemon_checksum(conn):
+    """Row count and SHA-256 of the pokemon table (excluding timestamps)"""
+    rows = conn.execute(
+        """
+        SELECT id, name, form, type1, type2,
+               base_hp, base_attack, base_defense, base_sp_attack, base_sp_defense, base_speed,
+               pogo_attack, pogo_defense, pogo_stamina, is_in_go, is_legendary
+        FROM pokemon
+    """
+    ).fetchall()
+    return compute_rows_checksum([tuple(row) for row in rows])
 
-                # Skip if pokemon is already in the DB
-                cursor.execute("SELECT COUNT(*) FROM pokemon WHERE id = ?", (pokemon_id,))
-                db_count = cursor.fetchone()[0]
-                if db_count > 0:
-                    success_count += 1
-                    continue
-                
-                # If not skipping, pull data and store
-                if fetch_and_store_pokemon_data(pokemon_id):
-                    success_count += 1
 
-            print(
-                f"DEBUG: Database population completed! {success_count}/{total_pokemon} Pokemon stored successfully."
-            )
+def validate_database(path, expected_ids, expected_row_count, expected_checksum, previous_row_count=0):
+    """
+    Check a freshly built database before it is swapped in, reading it back
+    and comparing against the row count and checksum of the rows that were
+    written
+    """
+    with get_db_connection(path) as conn:
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if integrity != "ok":
+            return False, f"integrity check failed: {integrity}"
+
+        row_count, id_count = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT id) FROM pokemon"
+        ).fetchone()
+        if id_count < expected_ids * REBUILD_MIN_ROW_RATIO:
+            return False, f"only {id_count}/{expected_ids} Pokemon were built"
+        if row_count < previous_row_count * REBUILD_MIN_ROW_RATIO:
+            return False, f"only {row_count} rows, live database has {previous_row_count}"
 
-            # Update metadata
-            cursor.execute(
+        if row_count != expected_row_count:
+            return False, f"{row_count} rows written back, expected {expected_row_count}"
+        if compute_pokemon_checksum(conn) != (expected_row_count, expected_checksum):
+            return False, "checksum does not match the rows that were built"
+
+    return True, f"{row_count} rows across {id_count} Pokemon"
+
+
+def rebuild_database(job=None):
+    """
+    Build a fresh database next to the live one, validate it and atomically
+    rename it over DATABASE_PATH. Connections are opened per request, so
+    running workers pick up the new file on their next request while
+    readers of the old file finish undisturbed. An interrupted rebuild
+    restarts cheaply since raw responses already fetched stay in api_store.
+    """
+    print("DEBUG: Starting database rebuild...")
+
+    try:
+        remove_rebuild_files()
+        init_database(REBUILD_DATABASE_PATH)
+
+        # Bulk load every raw response first, then build all rows in one pass
+        pokemon_resource_list = api_store.get_resource("pokemon", limit=1010)
+        urls = [ref["url"] for ref in pokemon_resource_list["results"][:1010]]
+
+        # Progress counts each URL twice: once to preload, once to build
+        total_steps = 2 * len(urls)
+
+        def report_preload(done, total):
+            job.check_cancelled()
+            job.progress(done * len(urls) // max(total, 1), total_steps)
+
+        api_store.preload(urls, on_progress=report_preload if job else None)
+
+        rows = []
+        for i, url in enumerate(urls):
+            if job:
+                job.check_cancelled()
+                job.progress(len(urls) + i, total_steps)
+            try:
+                rows.extend(build_pokemon_rows(api_store.get(url)))
+            except Exception as e:
+                print(f"ERROR building rows for {url}: {e}")
+
+        # Expected contents come from the built rows, not from the new file
+        expected_row_count, expected_checksum = compute_rows_checksum(rows)
+
+        with get_db_connection(REBUILD_DATABASE_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.executemany(INSERT_POKEMON_SQL, rows)
+            cursor.executemany(
                 "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
-                ("last_populated", f"{success_count} Pokemon"),
+                [
+                    ("last_populated", f"{len(urls)} Pokemon"),
+                    ("row_count", str(expected_row_count)),
+                    ("checksum", expected_checksum),
+                ],
             )
             conn.commit()
 
+        previous_row_count = 0
+        if os.path.exists(DATABASE_PATH):
+            with get_db_connection() as conn:
+                previous_row_count = conn.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0]
+
+        valid, message = validate_database(
+            REBUILD_DATABASE_PATH, len(urls), expected_row_count, expected_checksum, previous_row_count
+        )
+        if not valid:
+            print(f"ERROR: Rebuilt database failed validation, keeping live database: {message}")
+            remove_rebuild_files()
+            if job:
+                raise RuntimeError(f"Rebuilt database failed validation: {message}")
+            return False
+
+        if job:
+            job.check_cancelled()
+            job.progress(total_steps, total_steps)
+
+        swap_database(REBUILD_DATABASE_PATH)
+        print(f"DEBUG: Database rebuild completed and swapped in ({message})")
+
+        # The swap invalidates every cached index, so warm them again
+        job_scheduler.submit("precompute", precompute_bulk_indexes_job)
+        return True
+
+    except JobCancelled:
+        print("DEBUG: Database rebuild cancelled, keeping live database")
+        remove_rebuild_files()
+        raise
     except Exception as e:
-        print(f"ERROR during database population: {e}")
+        print(f"ERROR during database rebuild: {e}")
         import traceback
 
         print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        remove_rebuild_files()
+        if job:
+            raise
+        return False
+
+
+def remove_rebuild_files():
+    """Delete a leftover rebuild database and its journal"""
+    for suffix in ("", "-journal"):
+        if os.path.exists(REBUILD_DATABASE_PATH + suffix):
+            os.remove(REBUILD_DATABASE_PATH + suffix)
+
+
+def swap_database(new_path):
+    """Atomically replace the live database file with new_path"""
+    if not os.path.exists(DATABASE_PATH):
+        os.replace(new_path, DATABASE_PATH)
+        return
+
+    # Hold the live write lock so no writer is mid-transaction (with a hot
+    # journal next to DATABASE_PATH) while the file is renamed. Readers
+    # are not blocked.
+    with get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            os.replace(new_path, DATABASE_PATH)
+        finally:
+            conn.rollback()
 
 
 @app.route("/")
@@ -468,12 +1226,20 @@ def index():
 def get_pokemon_stats(pokemon_id, form):
     """Get Pokemon Go stats for a specific Pokemon"""
     form = form.lower()
+    try:
+        params = get_request_stat_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         data = get_pokemon_data(pokemon_id, form)
         if data:
-            return jsonify(data)
+            return jsonify(apply_stat_params(data, params))
         else:
             return jsonify({"error": "Pokemon not found"}), 404
+    except UpstreamUnavailable as e:
+        print(f"ERROR in get_pokemon_stats: {e}")
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         print(f"ERROR in get_pokemon_stats: {e}")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -492,40 +1258,36 @@ def get_top_attackers(defender_id, form):
         "max_filter": request.args.get("max_filter", "all"),
     }
 
+    try:
+        params = get_request_stat_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         defender = get_pokemon_data(defender_id, form)
         if not defender:
             return jsonify({"error": "Defender Pokemon not found"}), 404
-        
+
         attackers = []
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM pokemon WHERE is_in_go = 1")
-            
-            for row in cursor.fetchall():
-                if not should_include_pokemon_db(row, filters):
-                    continue
-                    
-                # No more multipliers needed, they are pre-calculated in the DB
-                pogo_attack = row["pogo_attack"]
-                attacker_types = [row["type1"]]
-                if row["type2"]:
-                    attacker_types.append(row["type2"])
-                    
-                effectiveness = calculate_type_effectiveness(attacker_types, defender["types"])
-                effective_attack = pogo_attack * effectiveness
-                
-                # ... append to attackers list ...
-                attackers.append({
-                    "name": row["name"],
-                    "id": row["id"],
-                    "form": row["form"],
-                    "types": attacker_types,
-                    "attack": pogo_attack,
-                    "effectiveness": round(effectiveness, 2),
-                    "effective_attack": round(effective_attack, 1),
-                    "is_legendary": bool(row["is_legendary"]),
-                })
+        for pokemon in get_roster(params):
+            if not should_include_pokemon_db(pokemon, filters):
+                continue
+
+            # Attack is recomputed from base stats for the requested params
+            pogo_attack = pokemon["attack"]
+            effectiveness = calculate_type_effectiveness(pokemon["types"], defender["types"])
+            effective_attack = pogo_attack * effectiveness
+
+            attackers.append({
+                "name": pokemon["name"],
+                "id": pokemon["id"],
+                "form": pokemon["form"],
+                "types": pokemon["types"],
+                "attack": pogo_attack,
+                "effectiveness": round(effectiveness, 2),
+                "effective_attack": round(effective_attack, 1),
+                "is_legendary": pokemon["is_legendary"],
+            })
 
         # Sort by effective attack and return top 25
         attackers.sort(key=lambda x: x["effective_attack"], reverse=True)
@@ -539,10 +1301,14 @@ def get_top_attackers(defender_id, form):
                 "defender": defender["name"],
                 "top_attackers": top_25,
                 "filters_applied": filters,
+                "params_hash": stat_params_hash(params),
                 "total_candidates": len(attackers),
             }
         )
 
+    except UpstreamUnavailable as e:
+        print(f"ERROR in get_top_attackers: {e}")
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         print(f"ERROR in get_top_attackers: {e}")
         import traceback
@@ -564,32 +1330,28 @@ def get_top_attackers_by_type(type_name):
         "max_filter": request.args.get("max_filter", "all"),
     }
 
+    try:
+        params = get_request_stat_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         attackers = []
 
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT * FROM pokemon WHERE is_in_go = 1 AND (type1 = ? OR type2 = ?)",
-                (type_name, type_name),
-            )
+        for pokemon in get_roster(params):
+            if type_name not in pokemon["types"]:
+                continue
+            if not should_include_pokemon_db(pokemon, filters):
+                continue
 
-            for row in cursor.fetchall():
-                if not should_include_pokemon_db(row, filters):
-                    continue
-
-                attacker_types = [row["type1"]]
-                if row["type2"]:
-                    attacker_types.append(row["type2"])
-                
-                attackers.append({
-                    "name": row["name"],
-                    "id": row["id"],
-                    "form": row["form"],
-                    "types": attacker_types,
-                    "attack": row["pogo_attack"],
-                    "is_legendary": bool(row["is_legendary"]),
-                })
+            attackers.append({
+                "name": pokemon["name"],
+                "id": pokemon["id"],
+                "form": pokemon["form"],
+                "types": pokemon["types"],
+                "attack": pokemon["attack"],
+                "is_legendary": pokemon["is_legendary"],
+            })
 
         # Sort by attack and return top 25
         attackers.sort(key=lambda x: x["attack"], reverse=True)
@@ -602,6 +1364,7 @@ def get_top_attackers_by_type(type_name):
                 "type": type_name.title(),
                 "top_attackers": top_25,
                 "filters_applied": filters,
+                "params_hash": stat_params_hash(params),
                 "total_candidates": len(attackers),
             }
         )
@@ -614,6 +1377,194 @@ def get_top_attackers_by_type(type_name):
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+@app.route("/api/top-defenders/<int:attacker_id>/<form>")
+def get_top_defenders(attacker_id, form):
+    """Get top 25 defenders (tanks) against a specific attacking Pokemon"""
+    form = form.lower()
+    print(f"DEBUG: Finding top defenders against Pokemon ID: {attacker_id}, Form: {form}")
+
+    filters = {
+        "legendary_filter": request.args.get("legendary_filter", "all"),
+        "mega_filter": request.args.get("mega_filter", "all"),
+        "shadow_filter": request.args.get("shadow_filter", "all"),
+        "max_filter": request.args.get("max_filter", "all"),
+    }
+
+    try:
+        params = get_request_stat_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        attacker = get_pokemon_data(attacker_id, form)
+        if not attacker:
+            return jsonify({"error": "Attacker Pokemon not found"}), 404
+
+        top_25 = get_top_defenders_from_index(attacker["types"], filters, params)
+
+        print(f"DEBUG: Top defender is {top_25[0]['name'] if top_25 else 'None'}")
+
+        return jsonify(
+            {
+                "attacker": attacker["name"],
+                "top_defenders": top_25,
+                "filters_applied": filters,
+                "params_hash": stat_params_hash(params),
+            }
+        )
+
+    except UpstreamUnavailable as e:
+        print(f"ERROR in get_top_defenders: {e}")
+        return jsonify({"error": str(e)}), e.status_code
+    except Exception as e:
+        print(f"ERROR in get_top_defenders: {e}")
+        import traceback
+
+        print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+@app.route("/api/top-defenders-by-type/<type_name>")
+def get_top_defenders_by_type(type_name):
+    """Get top 25 defenders (tanks) against a specific attacking type"""
+    type_name = type_name.lower()
+    print(f"DEBUG: Finding top defenders against {type_name} type")
+
+    if type_name not in POKEMON_TYPES:
+        return jsonify({"error": f"Unknown type: {type_name}"}), 404
+
+    filters = {
+        "legendary_filter": request.args.get("legendary_filter", "all"),
+        "mega_filter": request.args.get("mega_filter", "all"),
+        "shadow_filter": request.args.get("shadow_filter", "all"),
+        "max_filter": request.args.get("max_filter", "all"),
+    }
+
+    try:
+        params = get_request_stat_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        top_25 = get_top_defenders_from_index((type_name,), filters, params)
+
+        return jsonify(
+            {
+                "type": type_name.title(),
+                "top_defenders": top_25,
+                "filters_applied": filters,
+                "params_hash": stat_params_hash(params),
+            }
+        )
+
+    except Exception as e:
+        print(f"ERROR in get_top_defenders_by_type: {e}")
+        import traceback
+
+        print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+@app.route("/api/team-coverage", methods=["POST"])
+def get_team_coverage():
+    """Get type coverage of a team across all single and dual defender type combos"""
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    team_refs = payload.get("team", [])
+
+    if not isinstance(team_refs, list) or not team_refs:
+        return jsonify({"error": "Team must be a non-empty list of {id, form}"}), 400
+    if len(team_refs) > MAX_TEAM_SIZE:
+        return jsonify({"error": f"Team can have at most {MAX_TEAM_SIZE} Pokemon"}), 400
+
+    try:
+        params = resolve_stat_params(payload.get("params"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        team = []
+        for ref in team_refs:
+            try:
+                pokemon_id = int(ref["id"])
+                form = str(ref.get("form", "normal")).strip().lower()
+            except (KeyError, TypeError, ValueError, AttributeError):
+                return jsonify({"error": f"Invalid team member: {ref}"}), 400
+
+            member = get_pokemon_data(pokemon_id, form)
+            if not member:
+                return jsonify({"error": f"Pokemon {pokemon_id} ({form}) not found"}), 404
+            team.append(apply_stat_params(member, params))
+
+        result = calculate_team_coverage(team)
+        result["team"] = [
+            {"id": m["id"], "form": m["form"], "name": m["name"], "types": m["types"]}
+            for m in team
+        ]
+
+        print(f"DEBUG: Team coverage score {result['summary']['score']} with {result['summary']['hole_count']} holes")
+
+        return jsonify(result)
+
+    except UpstreamUnavailable as e:
+        print(f"ERROR in get_team_coverage: {e}")
+        return jsonify({"error": str(e)}), e.status_code
+    except Exception as e:
+        print(f"ERROR in get_team_coverage: {e}")
+        import traceback
+
+        print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+@app.route("/api/jobs")
+def get_jobs():
+    """Get status, progress, throughput and ETA of background jobs"""
+    return jsonify([job.to_dict() for job in job_scheduler.list()])
+
+
+@app.route("/api/jobs/<job_id>")
+def get_job(job_id):
+    """Get status of a single background job"""
+    job = job_scheduler.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+def is_local_request():
+    """Whether the current request comes from the loopback interface"""
+    return request.remote_addr in JOB_CONTROL_ADDRESSES
+
+
+@app.route("/api/jobs", methods=["POST"])
+def start_job():
+    """Start an ingest, precompute, rebuild or compact job (local clients only)"""
+    if not is_local_request():
+        return jsonify({"error": "Jobs can only be started from localhost"}), 403
+
+    payload = request.get_json(silent=True) or {}
+    name = payload.get("name")
+    if name not in JOB_TARGETS:
+        return jsonify({"error": f"Unknown job, expected one of {sorted(JOB_TARGETS)}"}), 400
+
+    job = job_scheduler.submit(name, JOB_TARGETS[name])
+    return jsonify(job.to_dict()), 202
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """Request cooperative cancellation of a background job (local clients only)"""
+    if not is_local_request():
+        return jsonify({"error": "Jobs can only be cancelled from localhost"}), 403
+
+    job = job_scheduler.cancel(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 202
+
+
 @app.route("/api/pokemon-list")
 def get_pokemon_list():
     try:
@@ -646,17 +1597,48 @@ def get_pokemon_list():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+def compact_api_store(job=None):
+    """Purge expired raw responses and reclaim free space in the store file"""
+    before = api_store.stats()
+    removed = api_store.compact()
+    after = api_store.stats()
+    if job:
+        job.progress(1, 1)
+    print(
+        f"DEBUG: Compacted raw response store: removed {removed} expired entries, "
+        f"{before['bytes']} -> {after['bytes']} bytes"
+    )
+
+
+def compact_then_populate(job):
+    """Startup job: compact the raw response store, then start population"""
+    try:
+        compact_api_store(job)
+    finally:
+        job_scheduler.submit("ingest", populate_database)
+
+
+def start_background_jobs():
+    """Start the background jobs that run when the app starts"""
+    job_scheduler.submit("compact", compact_then_populate)
+
+
+# Jobs that can be started through /api/jobs
+JOB_TARGETS = {
+    "ingest": populate_database,
+    "precompute": precompute_bulk_indexes_job,
+    "rebuild": rebuild_database,
+    "compact": compact_api_store,
+}
+
+
 def create_app():
     """Application factory function"""
     app = Flask(__name__)
     init_database()
 
     # Warm up the cache in the background for better performance
-    import threading
-
-    thread = threading.Thread(target=populate_database)
-    thread.daemon = True
-    thread.start()
+    start_background_jobs()
 
     return app
 
@@ -664,27 +1646,7 @@ def create_app():
 @app.route("/api/types")
 def get_types():
     """Get list of all Pokemon types"""
-    types = [
-        "normal",
-        "fire",
-        "water",
-        "electric",
-        "grass",
-        "ice",
-        "fighting",
-        "poison",
-        "ground",
-        "flying",
-        "psychic",
-        "bug",
-        "rock",
-        "ghost",
-        "dragon",
-        "dark",
-        "steel",
-        "fairy",
-    ]
-    return jsonify([{"name": t.title(), "value": t} for t in types])
+    return jsonify([{"name": t.title(), "value": t} for t in POKEMON_TYPES])
 
 # @app.route("/admin/cleardb")
 # def clear_table():
@@ -705,6 +1667,10 @@ def get_types():
 
 
 if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        # Rebuild and hot-swap the database without touching a running server
+        sys.exit(0 if rebuild_database() else 1)
+
     print("DEBUG: Starting Flask application...")
 
     # Load Pokemon list first
@@ -712,12 +1678,8 @@ if __name__ == "__main__":
     init_database()
 
     # Start cache warming in background when app starts
-    import threading
-
-    cache_thread = threading.Thread(target=populate_database)
-    cache_thread.daemon = True
-    cache_thread.start()
-    print("DEBUG: Cache warming thread started")
+    start_background_jobs()
+    print("DEBUG: Cache warming job started")
 
     print("DEBUG: Starting Flask server...")
     app.run(debug=True)
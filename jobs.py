@@ -0,0 +1,194 @@
+import threading
+import time
+import uuid
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (PENDING, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+
+class Job:
+    """
+    A background task with progress, a resumable checkpoint and cooperative
+    cancellation. The target function receives the job and should call
+    progress(), save_checkpoint() and check_cancelled() as it works.
+    """
+
+    def __init__(self, name, target, scheduler, checkpoint=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.target = target
+        self.scheduler = scheduler
+        self.checkpoint = checkpoint or {}
+        self.status = PENDING
+        self.done = 0
+        self.total = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._resumed_from = None
+        self._cancel_event = threading.Event()
+
+    def progress(self, done, total=None):
+        """Record how many items are done, out of total if known"""
+        # The first report of a run is the baseline for throughput, so
+        # items skipped by resuming from a checkpoint don't count
+        if self._resumed_from is None:
+            self._resumed_from = done
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def save_checkpoint(self, state):
+        """Persist state so an interrupted job can resume from it"""
+        self.checkpoint = dict(state)
+        self.scheduler._save_checkpoint(self.name, self.checkpoint)
+
+    def cancel(self):
+        """Request cancellation; the job stops at its next check_cancelled()"""
+        self._cancel_event.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation has been requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.name} was cancelled")
+
+    def to_dict(self):
+        """Status, progress, throughput and ETA of the job"""
+        throughput = None
+        eta_seconds = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            processed = self.done - (self._resumed_from or 0)
+            if elapsed > 0 and processed > 0:
+                throughput = processed / elapsed
+                if self.total is not None and self.status == RUNNING:
+                    eta_seconds = max(self.total - self.done, 0) / throughput
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "percent": round(100 * self.done / self.total, 1) if self.total else None,
+            "throughput_per_second": round(throughput, 2) if throughput else None,
+            "eta_seconds": round(eta_seconds, 1) if eta_seconds is not None else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobScheduler:
+    """
+    Runs jobs on daemon threads, at most max_concurrent at a time. Only one
+    job per name is active at once. Checkpoints go through the
+    load/save/clear callbacks so they survive a restart; a completed job
+    clears its checkpoint, a failed or cancelled one keeps it to resume.
+    """
+
+    def __init__(
+        self,
+        max_concurrent=2,
+        load_checkpoint=None,
+        save_checkpoint=None,
+        clear_checkpoint=None,
+        history_size=50,
+    ):
+        self._slots = threading.Semaphore(max_concurrent)
+        self._load_checkpoint = load_checkpoint or (lambda name: {})
+        self._save = save_checkpoint or (lambda name, state: None)
+        self._clear_checkpoint = clear_checkpoint or (lambda name: None)
+        self.history_size = history_size
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, target):
+        """Start a job, or return the already active job with the same name"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.name == name and job.status in ACTIVE_STATES:
+                    return job
+
+            job = Job(name, target, self)
+            self._jobs[job.id] = job
+            self._trim_history()
+
+        thread = threading.Thread(target=self._run, args=(job,))
+        thread.daemon = True
+        thread.start()
+        return job
+
+    def _run(self, job):
+        with self._slots:
+            if job.cancel_requested:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                return
+
+            try:
+                job.checkpoint = self._load_checkpoint(job.name) or {}
+            except Exception as e:
+                print(f"ERROR loading checkpoint for job {job.name}: {e}")
+                job.checkpoint = {}
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            print(f"DEBUG: Job {job.name} ({job.id}) started")
+
+            try:
+                job.target(job)
+                job.status = COMPLETED
+                self._clear_checkpoint(job.name)
+            except JobCancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e)
+                print(f"ERROR in job {job.name}: {e}")
+            finally:
+                job.finished_at = time.time()
+                print(f"DEBUG: Job {job.name} ({job.id}) {job.status}")
+
+    def _save_checkpoint(self, name, state):
+        try:
+            self._save(name, state)
+        except Exception as e:
+            print(f"ERROR saving checkpoint for job {name}: {e}")
+
+    def _trim_history(self):
+        finished = [j for j in self._jobs.values() if j.status not in ACTIVE_STATES]
+        excess = len(self._jobs) - self.history_size
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(excess, 0)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Request cancellation of a job; returns the job or None"""
+        job = self._jobs.get(job_id)
+        if job:
+            job.cancel()
+        return job
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
@@ -0,0 +1,267 @@
+import sqlite3
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+# Base URL for all PokeAPI resources
+API_BASE_URL = "https://pokeapi.co/api/v2/"
+
+# Defaults for the raw response store
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 days
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MB of compressed responses
+DEFAULT_TIMEOUT_SECONDS = 10
+# Hits only refresh an entry's LRU timestamp once it is older than this,
+# so most reads don't turn into write transactions
+ACCESS_TOUCH_INTERVAL_SECONDS = 60 * 60
+
+
+def resource_url(endpoint, resource_id=None, **params):
+    """Build the canonical PokeAPI URL used as the store key"""
+    url = f"{API_BASE_URL}{endpoint.strip('/')}/"
+    if resource_id is not None:
+        url += f"{resource_id}/"
+    if params:
+        url += "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return url
+
+
+class ResourceNotFound(LookupError):
+    """The upstream API has no resource at this URL"""
+
+
+class HTTPFetcher:
+    """Fetches raw JSON responses from PokeAPI over HTTP"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    def __call__(self, url):
+        req = Request(url, headers={"User-Agent": "pokemon-go-helper"})
+        try:
+            with urlopen(req, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except HTTPError as e:
+            if e.code == 404:
+                raise ResourceNotFound(f"No resource at {url}") from e
+            raise
+
+
+class LocalFetcher:
+    """
+    Stand-in fetcher for tests and offline use. Serves responses from a
+    dict of URL -> JSON, or from a directory of JSON files named after
+    the URL path (e.g. pokemon/25.json).
+    """
+
+    def __init__(self, responses=None, directory=None):
+        self.responses = responses or {}
+        self.directory = directory
+        self.calls = []
+
+    def __call__(self, url):
+        self.calls.append(url)
+        if url in self.responses:
+            return self.responses[url]
+
+        if self.directory:
+            path = url[len(API_BASE_URL):] if url.startswith(API_BASE_URL) else url
+            path = os.path.join(self.directory, path.split("?")[0].strip("/") + ".json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    return json.load(f)
+
+        raise ResourceNotFound(f"No local response for {url}")
+
+
+class PokeAPIStore:
+    """
+    Write-through store of raw PokeAPI responses kept in a single SQLite
+    file, keyed by resource URL. Bodies are zlib-compressed JSON. Entries
+    older than the TTL are re-fetched, and the least recently used entries
+    are evicted once the compressed size passes max_bytes.
+    """
+
+    def __init__(
+        self,
+        path,
+        fetcher=None,
+        ttl=DEFAULT_TTL_SECONDS,
+        max_bytes=DEFAULT_MAX_BYTES,
+    ):
+        self.path = path
+        self.fetcher = fetcher or HTTPFetcher()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._write_lock = threading.Lock()
+        self._init_store()
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_store(self):
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)"
+            )
+            conn.commit()
+
+    def _is_fresh(self, fetched_at, now):
+        return self.ttl is None or now - fetched_at < self.ttl
+
+    def get(self, url):
+        """Get a response from the store, fetching and storing it on a miss"""
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT body, fetched_at, accessed_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row and self._is_fresh(row[1], now):
+            if now - row[2] > ACCESS_TOUCH_INTERVAL_SECONDS:
+                with self._write_lock, self._connection() as conn:
+                    conn.execute(
+                        "UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url)
+                    )
+                    conn.commit()
+            return json.loads(zlib.decompress(row[0]))
+
+        data = self.fetcher(url)
+        self.put_many({url: data})
+        return data
+
+    def get_resource(self, endpoint, resource_id=None, **params):
+        """Get a PokeAPI resource, e.g. get_resource("pokemon", 25)"""
+        return self.get(resource_url(endpoint, resource_id, **params))
+
+    def put_many(self, responses):
+        """Store several raw responses in one transaction"""
+        now = time.time()
+        rows = []
+        for url, data in responses.items():
+            body = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+            rows.append((url, body, len(body), now, now))
+
+        with self._write_lock, self._connection() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO responses (url, body, size, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def preload(self, urls, on_progress=None, batch_size=50):
+        """
+        Fetch every URL that is missing or expired, storing them in batches.
+        on_progress(done, total) is called before each fetch with counts over
+        all urls (fresh ones count as done); it may raise to stop early, and
+        responses fetched so far are still stored.
+        """
+        urls = list(urls)
+        now = time.time()
+        with self._connection() as conn:
+            fresh = set()
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for url, fetched_at in conn.execute(
+                    f"SELECT url, fetched_at FROM responses WHERE url IN ({placeholders})",
+                    chunk,
+                ):
+                    if self._is_fresh(fetched_at, now):
+                        fresh.add(url)
+
+        missing = [url for url in dict.fromkeys(urls) if url not in fresh]
+        total = len(missing) + len(fresh)
+        stored = 0
+        fetched = {}
+        try:
+            for i, url in enumerate(missing):
+                if on_progress:
+                    on_progress(len(fresh) + i, total)
+                try:
+                    fetched[url] = self.fetcher(url)
+                except Exception as e:
+                    print(f"ERROR preloading {url}: {e}")
+
+                if len(fetched) >= batch_size:
+                    self.put_many(fetched)
+                    stored += len(fetched)
+                    fetched = {}
+
+            if on_progress:
+                on_progress(total, total)
+        finally:
+            if fetched:
+                self.put_many(fetched)
+                stored += len(fetched)
+
+        return stored
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the store fits in max_bytes"""
+        if self.max_bytes is None:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        doomed = []
+        for url, size in conn.execute(
+            "SELECT url, size FROM responses ORDER BY accessed_at"
+        ):
+            doomed.append((url,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE url = ?", doomed)
+
+    def purge_expired(self):
+        """Delete every entry older than the TTL"""
+        if self.ttl is None:
+            return 0
+        with self._write_lock, self._connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def compact(self):
+        """Purge expired entries and reclaim free space in the store file"""
+        removed = self.purge_expired()
+        with self._write_lock, self._connection() as conn:
+            conn.execute("VACUUM")
+        return removed
+
+    def stats(self):
+        """Entry count and compressed size of the store"""
+        with self._connection() as conn:
+            count, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes, "ttl": self.ttl}